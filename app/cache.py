@@ -0,0 +1,41 @@
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import Response
+
+# Caché en memoria para los endpoints de solo lectura (listados y ranking)
+# Guardo directamente el JSON ya serializado, así un acierto no toca la BD
+# ni vuelve a convertir nada. Las entradas duran 30 segundos como máximo
+_cache = TTLCache(maxsize=1024, ttl=30)
+_lock = Lock()  # TTLCache no es thread-safe por sí sola
+
+# Cada clave tiene un número de "generación" que sube cada vez que se invalida
+# Sirve para no guardar un resultado que se leyó de la BD antes de una escritura
+# que terminó mientras tanto (si no, quedaría guardado un dato viejo por 30 segundos)
+_generaciones: Dict[str, int] = {}
+
+def obtener_respuesta(clave: str) -> Tuple[Optional[Response], int]:
+    """Devolver la respuesta guardada para esta clave (o None si no está o ya expiró)
+    junto con la generación actual de la clave, que se le pasa después a guardar_respuesta"""
+    with _lock:
+        contenido = _cache.get(clave)
+        generacion = _generaciones.get(clave, 0)
+    if contenido is None:
+        return None, generacion
+    return Response(content=contenido, media_type="application/json"), generacion
+
+def guardar_respuesta(clave: str, contenido: bytes, generacion: int) -> Response:
+    """Guardar el JSON en la caché y devolverlo como respuesta
+    Si la clave se invalidó desde que se leyó la generación, no se guarda"""
+    with _lock:
+        if _generaciones.get(clave, 0) == generacion:
+            _cache[clave] = contenido
+    return Response(content=contenido, media_type="application/json")
+
+def invalidar(*claves: str):
+    """Borrar de la caché las claves indicadas (se usa cuando se crea o modifica algo)"""
+    with _lock:
+        for clave in claves:
+            _cache.pop(clave, None)
+            _generaciones[clave] = _generaciones.get(clave, 0) + 1
@@ -1,29 +1,97 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateIndex
 
 # Configuración de la base de datos SQLite
 # Usé SQLite porque es simple y no necesita servidor separado
-SQLALCHEMY_DATABASE_URL = "sqlite:///./tala_trivia.db"
+# El driver aiosqlite permite usar la BD de forma asíncrona (sin bloquear el event loop)
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./tala_trivia.db"
+
+logger = logging.getLogger(__name__)
 
 # Crear el engine para conectarse a la BD
-engine = create_engine(
+# Uso un pool de conexiones para reutilizarlas entre requests, así cada conexión
+# mantiene su caché de páginas de SQLite en vez de empezar de cero
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Necesario para SQLite con FastAPI
+    connect_args={
+        "timeout": 30  # Segundos que espera si la BD está bloqueada por otra escritura
+    },
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=5,
+    max_overflow=10,
+    pool_pre_ping=True,  # Revisa que la conexión siga viva antes de usarla
+    pool_recycle=1800  # Renueva las conexiones cada 30 minutos
 )
 
+# Configurar SQLite cada vez que se abre una conexión nueva
+# WAL permite que las lecturas no se bloqueen mientras alguien escribe
+# Los eventos se registran en el engine síncrono que está por debajo del async
+@event.listens_for(engine.sync_engine, "connect")
+def configurar_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Con WAL es seguro y bastante más rápido
+    cursor.execute("PRAGMA cache_size=-64000")  # ~64 MB de caché de páginas
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB de lectura con memory-map
+    cursor.execute("PRAGMA foreign_keys=ON")  # SQLite no las revisa si no se activa
+    cursor.close()
+
+# Antes de cerrar una conexión (al reciclarla o al apagar la app) corro PRAGMA optimize,
+# que es lo que recomienda SQLite para mantener al día las estadísticas de los índices
+# Como las conexiones viven en el pool, esto pasa pocas veces y no en cada request
+# Es solo mantenimiento: si falla no puede impedir que el pool cierre la conexión
+@event.listens_for(engine.sync_engine, "close")
+def optimizar_sqlite(dbapi_connection, connection_record):
+    # Si la conexión se invalidó (por ejemplo porque se cortó) no tiene sentido usarla
+    if connection_record is not None and connection_record.info.get("invalidada"):
+        return
+    try:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA optimize")
+        cursor.close()
+    except Exception:
+        logger.warning("No se pudo ejecutar PRAGMA optimize al cerrar la conexión", exc_info=True)
+
+# Marcar las conexiones invalidadas para que optimizar_sqlite no las use
+@event.listens_for(engine.sync_engine, "invalidate")
+@event.listens_for(engine.sync_engine, "soft_invalidate")
+def marcar_invalidada(dbapi_connection, connection_record, exception):
+    connection_record.info["invalidada"] = True
+
 # Crear la sesión de base de datos
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Con expire_on_commit=False los objetos mantienen sus datos después del commit,
+# así no hace falta volver a leerlos de la BD para devolverlos en la respuesta
+SessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base para los modelos
 Base = declarative_base()
 
+# create_all crea las tablas que faltan, pero no toca las que ya existen, así que
+# una BD creada con una versión anterior no recibe los índices nuevos de los modelos
+# Por eso al arrancar creo cada índice con IF NOT EXISTS (si ya está, no pasa nada)
+def crear_indices_faltantes(conn):
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            try:
+                conn.execute(CreateIndex(indice, if_not_exists=True))
+            except IntegrityError:
+                # Un índice único no se puede crear si la tabla ya tiene filas repetidas
+                logger.warning(
+                    "No se pudo crear el índice único %s: la tabla %s tiene filas repetidas",
+                    indice.name, tabla.name
+                )
+
 # Función para obtener la sesión de BD en cada request
 # La encontré en la documentación de FastAPI
-def get_db():
-    db = SessionLocal()
-    try:
+# Al usar "async with" la sesión se cierra sola al terminar el request
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()  # Siempre cerrar la conexión
 
@@ -1,8 +1,16 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+
+import orjson
+from fastapi import FastAPI, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, exists, func, lambda_stmt, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.database import engine, Base, get_db
+from app import cache
+from app.database import engine, Base, get_db, crear_indices_faltantes
 from app.models import Usuario, Pregunta, Trivia, TriviaPregunta, TriviaUsuario, Participacion
 from app.schemas import (
     UsuarioCreate, UsuarioResponse, 
@@ -12,45 +20,74 @@ from app.schemas import (
     RankingResponse, RankingItem
 )
 
+# Puntaje que da cada dificultad cuando la respuesta es correcta
+# Fácil = 1 punto, Medio = 2 puntos, Difícil = 3 puntos
+PUNTAJES_POR_DIFICULTAD = {
+    "fácil": 1,
+    "medio": 2,
+    "difícil": 3
+}
+
+# Para serializar los listados a JSON antes de guardarlos en la caché
+usuarios_adapter = TypeAdapter(List[UsuarioResponse])
+preguntas_adapter = TypeAdapter(List[PreguntaResponse])
+trivias_adapter = TypeAdapter(List[TriviaResponse])
+
 # Crear las tablas en la base de datos si no existen
-Base.metadata.create_all(bind=engine)
+# Con el engine async esto se hace al arrancar la aplicación
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Los emails se guardan en minúsculas; paso a minúsculas los de versiones anteriores
+        # (salvo que choquen con otro usuario que solo difiere en mayúsculas)
+        await conn.execute(text("""
+            UPDATE usuarios SET email = lower(email)
+            WHERE email != lower(email)
+            AND NOT EXISTS (
+                SELECT 1 FROM usuarios AS otro
+                WHERE lower(otro.email) = lower(usuarios.email) AND otro.id != usuarios.id
+            )
+        """))
+        await conn.run_sync(crear_indices_faltantes)  # Para BD creadas con versiones anteriores
+    yield
+    await engine.dispose()  # Cerrar las conexiones del pool al apagar
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="TalaTrivia API",
     description="API para gestionar trivias de recursos humanos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson serializa a JSON mucho más rápido que json.dumps
 )
 
+# Las respuestas de "/" y "/health" nunca cambian, así que las convierto a JSON
+# una sola vez al iniciar y después devuelvo siempre los mismos bytes
+ROOT_JSON = orjson.dumps({
+    "message": "¡Bienvenido a TalaTrivia API!",
+    "version": "1.0.0",
+    "docs": "/docs"
+})
+HEALTH_JSON = orjson.dumps({"status": "ok", "message": "API funcionando correctamente"})
+
 # Endpoint básico para verificar que la API está funcionando
 @app.get("/")
-def read_root():
-    return {
-        "message": "¡Bienvenido a TalaTrivia API!",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+async def read_root():
+    return Response(content=ROOT_JSON, media_type="application/json")
 
 # Endpoint de health check
 @app.get("/health")
-def health_check():
-    return {"status": "ok", "message": "API funcionando correctamente"}
+async def health_check():
+    return Response(content=HEALTH_JSON, media_type="application/json")
 
 # ============================================
 # ENDPOINTS DE USUARIOS
 # ============================================
 
 @app.post("/usuarios", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
-def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
+async def crear_usuario(usuario: UsuarioCreate, db: AsyncSession = Depends(get_db)):
     """Crear un nuevo usuario"""
-    # Primero verifico si el email ya existe para evitar duplicados
-    usuario_existente = db.query(Usuario).filter(Usuario.email == usuario.email).first()
-    if usuario_existente:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El email ya está registrado"
-        )
-    
     # Crear el nuevo usuario
     nuevo_usuario = Usuario(
         nombre=usuario.nombre,
@@ -58,22 +95,39 @@ def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     )
     
     # Guardar en la base de datos
+    # Si el email ya existe, la restricción única de la columna rechaza el INSERT
+    # (así no hace falta consultarlo antes)
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)  # Para obtener el ID que se generó
+    try:
+        await db.commit()  # El ID que se generó queda cargado en el objeto
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está registrado"
+        )
+    
+    cache.invalidar("usuarios")  # El listado guardado ya no está completo
     
     return nuevo_usuario
 
 @app.get("/usuarios", response_model=List[UsuarioResponse])
-def listar_usuarios(db: Session = Depends(get_db)):
+async def listar_usuarios(db: AsyncSession = Depends(get_db)):
     """Listar todos los usuarios"""
-    usuarios = db.query(Usuario).all()
-    return usuarios
+    respuesta, generacion = cache.obtener_respuesta("usuarios")
+    if respuesta is not None:
+        return respuesta
+    
+    resultado = await db.execute(select(Usuario))
+    usuarios = usuarios_adapter.validate_python(resultado.scalars().all(), from_attributes=True)
+    return cache.guardar_respuesta("usuarios", usuarios_adapter.dump_json(usuarios), generacion)
 
 @app.get("/usuarios/{usuario_id}", response_model=UsuarioResponse)
-def obtener_usuario(usuario_id: int, db: Session = Depends(get_db)):
+async def obtener_usuario(usuario_id: int, db: AsyncSession = Depends(get_db)):
     """Obtener un usuario específico por su ID"""
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    # lambda_stmt guarda la consulta ya armada y compilada, en cada request solo cambia el ID
+    resultado = await db.execute(lambda_stmt(lambda: select(Usuario).where(Usuario.id == usuario_id)))
+    usuario = resultado.scalar_one_or_none()
     if not usuario:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -86,7 +140,7 @@ def obtener_usuario(usuario_id: int, db: Session = Depends(get_db)):
 # ============================================
 
 @app.post("/preguntas", response_model=PreguntaResponse, status_code=status.HTTP_201_CREATED)
-def crear_pregunta(pregunta: PreguntaCreate, db: Session = Depends(get_db)):
+async def crear_pregunta(pregunta: PreguntaCreate, db: AsyncSession = Depends(get_db)):
     """Crear una nueva pregunta"""
     # Validar que la respuesta correcta esté dentro de las opciones disponibles
     if pregunta.respuesta_correcta not in pregunta.opciones:
@@ -96,7 +150,7 @@ def crear_pregunta(pregunta: PreguntaCreate, db: Session = Depends(get_db)):
         )
     
     # Validar que la dificultad sea una de las permitidas
-    dificultades_validas = ["fácil", "medio", "difícil"]
+    dificultades_validas = list(PUNTAJES_POR_DIFICULTAD)
     if pregunta.dificultad not in dificultades_validas:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -111,21 +165,28 @@ def crear_pregunta(pregunta: PreguntaCreate, db: Session = Depends(get_db)):
     )
     
     db.add(nueva_pregunta)
-    db.commit()
-    db.refresh(nueva_pregunta)
+    await db.commit()
+    
+    cache.invalidar("preguntas")
     
     return nueva_pregunta
 
 @app.get("/preguntas", response_model=List[PreguntaResponse])
-def listar_preguntas(db: Session = Depends(get_db)):
+async def listar_preguntas(db: AsyncSession = Depends(get_db)):
     """Listar todas las preguntas"""
-    preguntas = db.query(Pregunta).all()
-    return preguntas
+    respuesta, generacion = cache.obtener_respuesta("preguntas")
+    if respuesta is not None:
+        return respuesta
+    
+    resultado = await db.execute(select(Pregunta))
+    preguntas = preguntas_adapter.validate_python(resultado.scalars().all(), from_attributes=True)
+    return cache.guardar_respuesta("preguntas", preguntas_adapter.dump_json(preguntas), generacion)
 
 @app.get("/preguntas/{pregunta_id}", response_model=PreguntaResponse)
-def obtener_pregunta(pregunta_id: int, db: Session = Depends(get_db)):
+async def obtener_pregunta(pregunta_id: int, db: AsyncSession = Depends(get_db)):
     """Obtener una pregunta específica por su ID"""
-    pregunta = db.query(Pregunta).filter(Pregunta.id == pregunta_id).first()
+    resultado = await db.execute(lambda_stmt(lambda: select(Pregunta).where(Pregunta.id == pregunta_id)))
+    pregunta = resultado.scalar_one_or_none()
     if not pregunta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -138,19 +199,24 @@ def obtener_pregunta(pregunta_id: int, db: Session = Depends(get_db)):
 # ============================================
 
 @app.post("/trivias", response_model=TriviaResponse, status_code=status.HTTP_201_CREATED)
-def crear_trivia(trivia: TriviaCreate, db: Session = Depends(get_db)):
+async def crear_trivia(trivia: TriviaCreate, db: AsyncSession = Depends(get_db)):
     """Crear una nueva trivia y asignarle preguntas y usuarios"""
+    # Quitar IDs repetidos (manteniendo el orden) para no asignar dos veces lo mismo
+    pregunta_ids = list(dict.fromkeys(trivia.pregunta_ids))
+    usuario_ids = list(dict.fromkeys(trivia.usuario_ids))
+    
     # Verificar que todas las preguntas existan
-    preguntas = db.query(Pregunta).filter(Pregunta.id.in_(trivia.pregunta_ids)).all()
-    if len(preguntas) != len(trivia.pregunta_ids):
+    # Solo cuento cuántas hay en la BD, no hace falta traer las filas
+    cantidad = await db.scalar(select(func.count(Pregunta.id)).where(Pregunta.id.in_(pregunta_ids)))
+    if cantidad != len(pregunta_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Alguna pregunta no existe"
         )
     
     # Verificar que todos los usuarios existan
-    usuarios = db.query(Usuario).filter(Usuario.id.in_(trivia.usuario_ids)).all()
-    if len(usuarios) != len(trivia.usuario_ids):
+    cantidad = await db.scalar(select(func.count(Usuario.id)).where(Usuario.id.in_(usuario_ids)))
+    if cantidad != len(usuario_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Algún usuario no existe"
@@ -162,40 +228,47 @@ def crear_trivia(trivia: TriviaCreate, db: Session = Depends(get_db)):
         descripcion=trivia.descripcion
     )
     db.add(nueva_trivia)
-    db.commit()
-    db.refresh(nueva_trivia)
-    
-    # Asignar preguntas a la trivia
-    for pregunta_id in trivia.pregunta_ids:
-        trivia_pregunta = TriviaPregunta(
-            trivia_id=nueva_trivia.id,
-            pregunta_id=pregunta_id
-        )
-        db.add(trivia_pregunta)
+    await db.flush()  # Con flush ya tengo el ID (y la fecha de creación) sin hacer commit todavía
     
-    # Asignar usuarios a la trivia
-    for usuario_id in trivia.usuario_ids:
-        trivia_usuario = TriviaUsuario(
-            trivia_id=nueva_trivia.id,
-            usuario_id=usuario_id
-        )
-        db.add(trivia_usuario)
+    # Asignar preguntas a la trivia (un solo INSERT con todas las filas)
+    if pregunta_ids:
+        await db.execute(TriviaPregunta.__table__.insert(), [
+            {"trivia_id": nueva_trivia.id, "pregunta_id": pregunta_id}
+            for pregunta_id in pregunta_ids
+        ])
     
-    db.commit()
-    db.refresh(nueva_trivia)
+    # Asignar usuarios a la trivia (igual que las preguntas)
+    if usuario_ids:
+        await db.execute(TriviaUsuario.__table__.insert(), [
+            {"trivia_id": nueva_trivia.id, "usuario_id": usuario_id}
+            for usuario_id in usuario_ids
+        ])
+    
+    # Todo en una sola transacción
+    await db.commit()
+    
+    cache.invalidar("trivias")
     
     return nueva_trivia
 
 @app.get("/trivias", response_model=List[TriviaResponse])
-def listar_trivias(db: Session = Depends(get_db)):
+async def listar_trivias(db: AsyncSession = Depends(get_db)):
     """Listar todas las trivias"""
-    trivias = db.query(Trivia).all()
-    return trivias
+    respuesta, generacion = cache.obtener_respuesta("trivias")
+    if respuesta is not None:
+        return respuesta
+    
+    resultado = await db.execute(select(Trivia))
+    trivias = trivias_adapter.validate_python(resultado.scalars().all(), from_attributes=True)
+    return cache.guardar_respuesta("trivias", trivias_adapter.dump_json(trivias), generacion)
 
 @app.get("/trivias/{trivia_id}", response_model=TriviaResponse)
-def obtener_trivia(trivia_id: int, db: Session = Depends(get_db)):
+async def obtener_trivia(trivia_id: int, db: AsyncSession = Depends(get_db)):
     """Obtener una trivia específica por su ID"""
-    trivia = db.query(Trivia).filter(Trivia.id == trivia_id).first()
+    resultado = await db.execute(
+        lambda_stmt(lambda: select(Trivia).where(Trivia.id == trivia_id))
+    )
+    trivia = resultado.scalar_one_or_none()
     if not trivia:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -208,104 +281,108 @@ def obtener_trivia(trivia_id: int, db: Session = Depends(get_db)):
 # ============================================
 
 @app.get("/trivias/{trivia_id}/usuario/{usuario_id}/preguntas", response_model=List[PreguntaJugador])
-def ver_trivia_jugador(trivia_id: int, usuario_id: int, db: Session = Depends(get_db)):
+async def ver_trivia_jugador(trivia_id: int, usuario_id: int, db: AsyncSession = Depends(get_db)):
     """Ver las preguntas de una trivia asignada a un usuario (SIN respuesta correcta ni dificultad)"""
     # Verificar que el usuario esté asignado a esta trivia
-    asignacion = db.query(TriviaUsuario).filter(
-        TriviaUsuario.trivia_id == trivia_id,
-        TriviaUsuario.usuario_id == usuario_id
-    ).first()
+    asignado = await db.scalar(
+        lambda_stmt(lambda: select(exists().where(
+            TriviaUsuario.trivia_id == trivia_id,
+            TriviaUsuario.usuario_id == usuario_id
+        )))
+    )
     
-    if not asignacion:
+    if not asignado:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="El usuario no está asignado a esta trivia"
         )
     
-    # Obtener todas las preguntas que pertenecen a esta trivia
-    trivia_preguntas = db.query(TriviaPregunta).filter(
-        TriviaPregunta.trivia_id == trivia_id
-    ).all()
+    # Obtener todas las preguntas de esta trivia en una sola consulta (JOIN)
+    # Antes hacía un SELECT por cada pregunta, ahora es uno solo
+    resultado = await db.execute(
+        select(Pregunta).join(
+            TriviaPregunta, TriviaPregunta.pregunta_id == Pregunta.id
+        ).where(
+            TriviaPregunta.trivia_id == trivia_id
+        ).order_by(TriviaPregunta.id)
+    )
+    preguntas = resultado.scalars().all()
     
     # Construir la lista de preguntas pero SIN mostrar la respuesta correcta ni la dificultad
-    # Esto es importante según el enunciado
-    preguntas_jugador = []
-    for tp in trivia_preguntas:
-        pregunta = db.query(Pregunta).filter(Pregunta.id == tp.pregunta_id).first()
-        if pregunta:
-            preguntas_jugador.append(PreguntaJugador(
-                id=pregunta.id,
-                texto_pregunta=pregunta.texto_pregunta,
-                opciones=pregunta.opciones
-                # No incluyo respuesta_correcta ni dificultad
-            ))
-    
-    return preguntas_jugador
+    # Esto es importante según el enunciado (PreguntaJugador no tiene esos campos)
+    return [PreguntaJugador.model_validate(pregunta) for pregunta in preguntas]
 
 @app.post("/trivias/{trivia_id}/responder", response_model=ParticipacionResponse, status_code=status.HTTP_201_CREATED)
-def responder_pregunta(trivia_id: int, participacion: ParticipacionCreate, db: Session = Depends(get_db)):
+async def responder_pregunta(trivia_id: int, participacion: ParticipacionCreate, db: AsyncSession = Depends(get_db)):
     """Responder una pregunta de una trivia. Calcula automáticamente si es correcta y el puntaje."""
+    # Hago todas las validaciones en una sola consulta: cada EXISTS es una verificación
+    # y de paso traigo los datos de la pregunta para validar respuesta y calcular puntaje
+    # Uso lambda_stmt para que SQLAlchemy no tenga que armar y compilar la consulta en cada request
+    usuario_id = participacion.usuario_id
+    pregunta_id = participacion.pregunta_id
+    resultado = await db.execute(lambda_stmt(
+        lambda: select(
+            exists().where(Trivia.id == trivia_id).label("trivia_existe"),
+            exists().where(
+                TriviaUsuario.trivia_id == trivia_id,
+                TriviaUsuario.usuario_id == usuario_id
+            ).label("asignado"),
+            exists().where(
+                TriviaPregunta.trivia_id == trivia_id,
+                TriviaPregunta.pregunta_id == pregunta_id
+            ).label("pregunta_en_trivia"),
+            exists().where(
+                Participacion.usuario_id == usuario_id,
+                Participacion.trivia_id == trivia_id,
+                Participacion.pregunta_id == pregunta_id
+            ).label("ya_respondio"),
+            select(Pregunta.respuesta_correcta).where(
+                Pregunta.id == pregunta_id
+            ).scalar_subquery().label("respuesta_correcta"),
+            select(Pregunta.dificultad).where(
+                Pregunta.id == pregunta_id
+            ).scalar_subquery().label("dificultad")
+        )
+    ))
+    datos = resultado.one()
+    
     # Verificar que la trivia existe
-    trivia = db.query(Trivia).filter(Trivia.id == trivia_id).first()
-    if not trivia:
+    if not datos.trivia_existe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Trivia con ID {trivia_id} no encontrada"
         )
     
     # Verificar que el usuario esté asignado a la trivia
-    asignacion = db.query(TriviaUsuario).filter(
-        TriviaUsuario.trivia_id == trivia_id,
-        TriviaUsuario.usuario_id == participacion.usuario_id
-    ).first()
-    
-    if not asignacion:
+    if not datos.asignado:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="El usuario no está asignado a esta trivia"
         )
     
     # Verificar que la pregunta pertenece a la trivia
-    pregunta_en_trivia = db.query(TriviaPregunta).filter(
-        TriviaPregunta.trivia_id == trivia_id,
-        TriviaPregunta.pregunta_id == participacion.pregunta_id
-    ).first()
-    
-    if not pregunta_en_trivia:
+    if not datos.pregunta_en_trivia:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La pregunta no pertenece a esta trivia"
         )
     
     # Verificar si ya respondió esta pregunta
-    participacion_existente = db.query(Participacion).filter(
-        Participacion.usuario_id == participacion.usuario_id,
-        Participacion.trivia_id == trivia_id,
-        Participacion.pregunta_id == participacion.pregunta_id
-    ).first()
-    
-    if participacion_existente:
+    # (las BD creadas antes de la restricción única de participaciones no la tienen,
+    # porque create_all no modifica tablas que ya existen)
+    if datos.ya_respondio:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya has respondido esta pregunta"
         )
     
-    # Obtener la pregunta para validar respuesta y calcular puntaje
-    pregunta = db.query(Pregunta).filter(Pregunta.id == participacion.pregunta_id).first()
-    
     # Verificar si la respuesta es correcta comparando con la respuesta correcta de la pregunta
-    es_correcta = 1 if participacion.respuesta_dada == pregunta.respuesta_correcta else 0
+    es_correcta = 1 if participacion.respuesta_dada == datos.respuesta_correcta else 0
     
     # Calcular el puntaje según la dificultad
-    # Fácil = 1 punto, Medio = 2 puntos, Difícil = 3 puntos
     # Solo se otorgan puntos si la respuesta es correcta
-    puntajes = {
-        "fácil": 1,
-        "medio": 2,
-        "difícil": 3
-    }
     if es_correcta:
-        puntaje_obtenido = puntajes.get(pregunta.dificultad, 0)
+        puntaje_obtenido = PUNTAJES_POR_DIFICULTAD.get(datos.dificultad, 0)
     else:
         puntaje_obtenido = 0
     
@@ -319,30 +396,44 @@ def responder_pregunta(trivia_id: int, participacion: ParticipacionCreate, db: S
         puntaje_obtenido=puntaje_obtenido
     )
     
+    # Si llegan dos respuestas a la vez, las dos pasan la verificación de arriba,
+    # pero la restricción única de la tabla rechaza el segundo INSERT
     db.add(nueva_participacion)
-    db.commit()
-    db.refresh(nueva_participacion)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya has respondido esta pregunta"
+        )
+    
+    cache.invalidar(f"ranking:{trivia_id}")  # Cambió el puntaje de alguien en esta trivia
     
     return nueva_participacion
 
 @app.get("/trivias/{trivia_id}/usuario/{usuario_id}/puntaje")
-def obtener_puntaje_usuario(trivia_id: int, usuario_id: int, db: Session = Depends(get_db)):
+async def obtener_puntaje_usuario(trivia_id: int, usuario_id: int, db: AsyncSession = Depends(get_db)):
     """Obtener el puntaje total de un usuario en una trivia"""
-    # Obtener todas las participaciones del usuario en esta trivia
-    participaciones = db.query(Participacion).filter(
-        Participacion.trivia_id == trivia_id,
-        Participacion.usuario_id == usuario_id
-    ).all()
-    
-    # Sumar todos los puntajes
-    puntaje_total = sum(p.puntaje_obtenido for p in participaciones)
+    # Calcular el puntaje, las respuestas y las correctas directo en la BD (una sola consulta)
+    resultado = await db.execute(
+        select(
+            func.coalesce(func.sum(Participacion.puntaje_obtenido), 0).label("puntaje_total"),
+            func.count(Participacion.id).label("total_respuestas"),
+            func.coalesce(func.sum(Participacion.es_correcta), 0).label("respuestas_correctas")
+        ).where(
+            Participacion.trivia_id == trivia_id,
+            Participacion.usuario_id == usuario_id
+        )
+    )
+    totales = resultado.one()
     
     return {
         "usuario_id": usuario_id,
         "trivia_id": trivia_id,
-        "puntaje_total": puntaje_total,
-        "total_respuestas": len(participaciones),
-        "respuestas_correctas": sum(1 for p in participaciones if p.es_correcta == 1)
+        "puntaje_total": totales.puntaje_total,
+        "total_respuestas": totales.total_respuestas,
+        "respuestas_correctas": totales.respuestas_correctas
     }
 
 # ============================================
@@ -350,57 +441,63 @@ def obtener_puntaje_usuario(trivia_id: int, usuario_id: int, db: Session = Depen
 # ============================================
 
 @app.get("/trivias/{trivia_id}/ranking", response_model=RankingResponse)
-def obtener_ranking(trivia_id: int, db: Session = Depends(get_db)):
+async def obtener_ranking(trivia_id: int, db: AsyncSession = Depends(get_db)):
     """Obtener el ranking de usuarios en una trivia (ordenado de mayor a menor puntaje)"""
+    # Si el ranking se calculó hace poco lo devuelvo directo desde la caché
+    clave_cache = f"ranking:{trivia_id}"
+    respuesta, generacion = cache.obtener_respuesta(clave_cache)
+    if respuesta is not None:
+        return respuesta
+    
     # Verificar que la trivia existe
-    trivia = db.query(Trivia).filter(Trivia.id == trivia_id).first()
+    trivia = await db.get(Trivia, trivia_id)
     if not trivia:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Trivia con ID {trivia_id} no encontrada"
         )
     
-    # Obtener todos los usuarios que están asignados a esta trivia
-    asignaciones = db.query(TriviaUsuario).filter(
-        TriviaUsuario.trivia_id == trivia_id
-    ).all()
-    
-    # Calcular el puntaje total de cada usuario
-    ranking_items = []
-    for asignacion in asignaciones:
-        usuario = db.query(Usuario).filter(Usuario.id == asignacion.usuario_id).first()
-        
-        # Buscar todas las respuestas que este usuario dio en esta trivia
-        participaciones = db.query(Participacion).filter(
-            Participacion.trivia_id == trivia_id,
-            Participacion.usuario_id == usuario.id
-        ).all()
-        
-        # Sumar todos los puntos que obtuvo
-        puntaje_total = sum(p.puntaje_obtenido for p in participaciones)
-        
-        ranking_items.append({
-            "usuario_id": usuario.id,
-            "usuario_nombre": usuario.nombre,
-            "puntaje_total": puntaje_total
-        })
-    
-    # Ordenar de mayor a menor puntaje (el que tiene más puntos primero)
-    ranking_items.sort(key=lambda x: x["puntaje_total"], reverse=True)
+    # Calcular el puntaje total de cada usuario asignado en una sola consulta
+    # El LEFT JOIN es para que los usuarios que no respondieron nada salgan con 0
+    puntaje_total = func.coalesce(func.sum(Participacion.puntaje_obtenido), 0).label("puntaje_total")
+    resultado = await db.execute(
+        select(
+            Usuario.id,
+            Usuario.nombre,
+            puntaje_total
+        ).join(
+            TriviaUsuario, TriviaUsuario.usuario_id == Usuario.id
+        ).outerjoin(
+            Participacion, and_(
+                Participacion.usuario_id == Usuario.id,
+                Participacion.trivia_id == trivia_id
+            )
+        ).where(
+            TriviaUsuario.trivia_id == trivia_id
+        ).group_by(
+            Usuario.id, Usuario.nombre
+        ).order_by(
+            puntaje_total.desc(),  # De mayor a menor puntaje
+            func.min(TriviaUsuario.id)  # Si empatan, queda primero el que se asignó antes
+        )
+    )
+    filas = resultado.all()
     
     # Agregar la posición en el ranking
-    ranking_final = []
-    for posicion, item in enumerate(ranking_items, start=1):
-        ranking_final.append(RankingItem(
+    ranking_final = [
+        RankingItem(
             posicion=posicion,
-            usuario_id=item["usuario_id"],
-            usuario_nombre=item["usuario_nombre"],
-            puntaje_total=item["puntaje_total"]
-        ))
+            usuario_id=fila.id,
+            usuario_nombre=fila.nombre,
+            puntaje_total=fila.puntaje_total
+        )
+        for posicion, fila in enumerate(filas, start=1)
+    ]
     
-    return RankingResponse(
+    ranking = RankingResponse(
         trivia_id=trivia_id,
         trivia_nombre=trivia.nombre,
         ranking=ranking_final
     )
+    return cache.guardar_respuesta(clave_cache, ranking.model_dump_json().encode(), generacion)
 
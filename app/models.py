@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -11,6 +11,12 @@ class Usuario(Base):
     nombre = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=False, index=True)  # El email debe ser único
     
+    # Índice único sobre lower(email): aunque en la BD queden emails viejos con mayúsculas,
+    # "Maxi@..." y "maxi@..." cuentan como el mismo y el INSERT del repetido falla
+    __table_args__ = (
+        Index("uq_usuarios_email_lower", func.lower(email), unique=True),
+    )
+    
     # Relación con trivias (muchos a muchos a través de TriviaUsuario)
     trivias = relationship("TriviaUsuario", back_populates="usuario", cascade="all, delete-orphan")
 
@@ -45,6 +51,11 @@ class Trivia(Base):
 # Una trivia puede tener muchas preguntas y una pregunta puede estar en muchas trivias
 class TriviaPregunta(Base):
     __tablename__ = "trivia_preguntas"
+    # Una pregunta no puede estar dos veces en la misma trivia
+    # (el índice único también sirve para buscar las preguntas de una trivia)
+    __table_args__ = (
+        Index("uq_trivia_pregunta", "trivia_id", "pregunta_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     trivia_id = Column(Integer, ForeignKey("trivias.id"), nullable=False)
@@ -57,6 +68,10 @@ class TriviaPregunta(Base):
 # Tabla intermedia para relacionar Trivia con Usuario (muchos a muchos)
 class TriviaUsuario(Base):
     __tablename__ = "trivia_usuarios"
+    # Un usuario no puede estar asignado dos veces a la misma trivia
+    __table_args__ = (
+        Index("uq_trivia_usuario", "trivia_id", "usuario_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     trivia_id = Column(Integer, ForeignKey("trivias.id"), nullable=False)
@@ -69,6 +84,11 @@ class TriviaUsuario(Base):
 # Modelo para guardar las respuestas de los usuarios
 class Participacion(Base):
     __tablename__ = "participaciones"
+    # Un usuario solo puede responder una vez cada pregunta de una trivia
+    # El índice único también sirve para buscar las respuestas de un usuario en una trivia (puntaje y ranking)
+    __table_args__ = (
+        Index("uq_participacion", "trivia_id", "usuario_id", "pregunta_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Dict, List, Optional
 from datetime import datetime
 
@@ -7,6 +7,12 @@ class UsuarioCreate(BaseModel):
     nombre: str = Field(..., description="Nombre del usuario", example="Maxi")
     email: EmailStr = Field(..., description="Email del usuario", example="maxi17arias@gmail.com")
     
+    # Guardo el email siempre en minúsculas para que "Maxi@..." y "maxi@..." cuenten como el mismo
+    @field_validator("email")
+    @classmethod
+    def email_en_minusculas(cls, v: str) -> str:
+        return v.lower()
+    
     class Config:
         json_schema_extra = {
             "example": {